@@ -1,5 +1,7 @@
 # -*- mode: python ; coding: utf-8 -*-
-from PyInstaller.utils.hooks import collect_all, collect_submodules
+import sys
+
+from PyInstaller.utils.hooks import collect_all
 
 datas = [('static', 'static')]
 binaries = []
@@ -9,16 +11,13 @@ hiddenimports = [
     'uvicorn.protocols.websockets', 'uvicorn.protocols.websockets.auto',
     'uvicorn.lifespan', 'uvicorn.lifespan.on',
     'meshtastic', 'meshtastic.serial_interface', 'meshtastic.tcp_interface',
-    'aiosqlite', 'websockets', 'websockets.legacy', 'websockets.legacy.server',
+    'websockets', 'websockets.legacy', 'websockets.legacy.server',
 ]
 
 # Collect meshtastic
 tmp_ret = collect_all('meshtastic')
 datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
 
-# Collect aiosqlite
-hiddenimports += collect_submodules('aiosqlite')
-
 
 a = Analysis(
     ['main.py'],
@@ -31,7 +30,9 @@ a = Analysis(
     runtime_hooks=[],
     excludes=[],
     noarchive=False,
-    optimize=0,
+    # Level 1 drops asserts; level 2 would also drop the docstrings FastAPI
+    # turns into the OpenAPI endpoint descriptions
+    optimize=1,
 )
 pyz = PYZ(a.pure)
 
@@ -44,7 +45,8 @@ exe = EXE(
     name='MeshRadar',
     debug=False,
     bootloader_ignore_signals=False,
-    strip=False,
+    # strip(1) is not available for Windows binaries
+    strip=sys.platform != 'win32',
     upx=True,
     upx_exclude=[],
     runtime_tmpdir=None,
@@ -1,83 +1,390 @@
-import aiosqlite
 import asyncio
-from typing import Optional
+import logging
+import queue
+import sqlite3
+import threading
+from typing import AsyncIterator, Callable, Final, List, Optional
 from settings import DB_PATH
 
+logger = logging.getLogger(__name__)
 
-_db: Optional[aiosqlite.Connection] = None
+# Connection tuning applied to every file-backed connection.
+# WAL lets readers proceed while a write is in flight, and with
+# synchronous=NORMAL a commit no longer waits for an fsync.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA wal_autocheckpoint=1000",
+)
+# How often the WAL file is checkpointed and truncated in the background
+CHECKPOINT_INTERVAL = 300.0
+# Group commit: writes are queued and applied by a single task, so a burst
+# of incoming packets shares one transaction (and one fsync)
+WRITE_BATCH_SIZE = 64
+WRITE_BATCH_DELAY = 0.005
+# sqlite3 keeps compiled statements in a per-connection LRU keyed by SQL
+# text; every query below uses a fixed string so repeat calls skip the parser
+STATEMENT_CACHE_SIZE = 256
+
+# Columns returned by get_messages, in SELECT order
+MESSAGE_COLUMNS = (
+    "id",
+    "packet_id",
+    "sender",
+    "receiver",
+    "channel",
+    "text",
+    "timestamp",
+    "ack_status",
+    "is_outgoing",
+    "reply_id",
+)
+
+# get_messages query shapes. The inner query picks the newest rows via the
+# index, the outer one flips them back to chronological order for the chat
+# view. They are formatted once here so each shape is one stable SQL string,
+# i.e. one statement-cache entry that every call hits.
+_MESSAGES_TEMPLATE: Final[str] = (
+    "SELECT * FROM ("
+    f"SELECT {', '.join(MESSAGE_COLUMNS)} FROM messages"
+    " {where} ORDER BY id DESC LIMIT ?"
+    ") ORDER BY id"
+)
+_SQL_MESSAGES_DM: Final[str] = _MESSAGES_TEMPLATE.format(
+    where="WHERE channel = 0 AND ("
+    "(sender = ? AND receiver = ?) OR (sender = ? AND receiver = ?))"
+)
+_SQL_MESSAGES_PARTNER: Final[str] = _MESSAGES_TEMPLATE.format(
+    where="WHERE (sender = ? OR receiver = ?) AND channel = 0"
+)
+_SQL_MESSAGES_CHANNEL: Final[str] = _MESSAGES_TEMPLATE.format(where="WHERE channel = ?")
+_SQL_MESSAGES_ALL: Final[str] = _MESSAGES_TEMPLATE.format(where="")
+
+# The remaining hot statements. sqlite3 looks its statement cache up by the
+# SQL string; passing the same str object every time means its hash is
+# already cached and the key compare short-circuits on identity.
+_SQL_INSERT_MESSAGE: Final[str] = """INSERT INTO messages (packet_id, sender, receiver, channel, text, is_outgoing, ack_status, reply_id)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+           RETURNING id"""
+# executemany cannot consume RETURNING rows, so bulk inserts use a plain INSERT
+_SQL_INSERT_MESSAGES: Final[str] = """INSERT INTO messages (packet_id, sender, receiver, channel, text, is_outgoing, ack_status, reply_id)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+_SQL_UPDATE_ACK: Final[str] = "UPDATE messages SET ack_status = ? WHERE packet_id = ?"
+_SQL_SAVE_SETTING: Final[str] = "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)"
+_SQL_GET_SETTING: Final[str] = "SELECT value FROM settings WHERE key = ?"
+_SQL_CHECKPOINT: Final[str] = "PRAGMA wal_checkpoint(TRUNCATE)"
+
+# Rows pulled from the cursor per round-trip when streaming messages
+MESSAGE_FETCH_SIZE = 64
+
+# Read-only connections used for queries; under WAL they never wait for the writer
+READER_COUNT = 2
+
+
+class _Connection:
+    """A sqlite3 connection owned by a dedicated thread.
+
+    Work is submitted as a function taking the sqlite3.Connection and runs
+    on that thread in one go, so e.g. execute + commit + lastrowid costs a
+    single thread hop instead of one per call as with aiosqlite.
+    """
+
+    def __init__(self, name: str, query_only: bool = False):
+        self._loop = asyncio.get_running_loop()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._query_only = query_only
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def run(self, fn: Callable, *args) -> "asyncio.Future":
+        """Schedule fn(conn, *args) on the connection thread"""
+        future = self._loop.create_future()
+        self._queue.put((future, fn, args))
+        return future
+
+    async def close(self):
+        self._queue.put(None)
+        await asyncio.to_thread(self._thread.join)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(DB_PATH, cached_statements=STATEMENT_CACHE_SIZE)
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        if self._query_only:
+            conn.execute("PRAGMA query_only=1")
+        return conn
+
+    def _run(self):
+        conn = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, fn, args = item
+            try:
+                # Connect lazily so an open error surfaces to the first caller
+                if conn is None:
+                    conn = self._connect()
+                result = fn(conn, *args)
+            except BaseException as e:
+                self._loop.call_soon_threadsafe(_set_exception, future, e)
+            else:
+                self._loop.call_soon_threadsafe(_set_result, future, result)
+        if conn is not None:
+            conn.close()
+
+
+def _set_result(future: "asyncio.Future", result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: "asyncio.Future", exc: BaseException):
+    if not future.done():
+        future.set_exception(exc)
+
+
+_writer: Optional[_Connection] = None
+_readers: List[_Connection] = []
+_reader_index = 0
 _lock = asyncio.Lock()
+_checkpoint_task: Optional[asyncio.Task] = None
+_write_queue: Optional[asyncio.Queue] = None
+_writer_task: Optional[asyncio.Task] = None
 
 
-async def get_db() -> aiosqlite.Connection:
-    global _db
-    async with _lock:
-        if _db is None:
-            _db = await aiosqlite.connect(DB_PATH)
-            _db.row_factory = aiosqlite.Row
-        return _db
+async def _checkpoint_loop():
+    """Periodically fold the WAL back into the database file"""
+    while True:
+        await asyncio.sleep(CHECKPOINT_INTERVAL)
+        try:
+            await _writer.run(_execute, _SQL_CHECKPOINT, ())
+        except Exception as e:
+            logger.warning(f"WAL checkpoint failed: {e}")
 
 
-async def close_db():
-    global _db
+async def _open():
+    global _writer, _readers, _checkpoint_task
+    # Fast path: once open, callers never touch the lock
+    if _writer is not None:
+        return
     async with _lock:
-        if _db:
-            await _db.close()
-            _db = None
+        if _writer is not None:
+            return
+        _writer = _Connection("sqlite-writer")
+        _readers = [
+            _Connection(f"sqlite-reader-{i}", query_only=True)
+            for i in range(READER_COUNT)
+        ]
+        _checkpoint_task = asyncio.create_task(_checkpoint_loop())
 
 
-async def init_db():
-    db = await get_db()
-    await db.execute(
-        """
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            packet_id INTEGER,
-            sender TEXT NOT NULL,
-            receiver TEXT,
-            channel INTEGER DEFAULT 0,
-            text TEXT NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            ack_status TEXT DEFAULT 'pending',
-            is_outgoing INTEGER DEFAULT 0,
-            reply_id INTEGER
-        )
+async def get_writer() -> _Connection:
+    """The single write connection; jobs on it never interleave"""
+    if _writer is None:
+        await _open()
+    return _writer
+
+
+async def get_reader() -> _Connection:
+    """Pick the next read-only connection, round-robin"""
+    global _reader_index
+    if _writer is None:
+        await _open()
+    _reader_index = (_reader_index + 1) % len(_readers)
+    return _readers[_reader_index]
+
+
+def _execute(conn: sqlite3.Connection, sql: str, params: tuple):
+    conn.execute(sql, params)
+
+
+def _run_statement(conn: sqlite3.Connection, sql: str, params) -> Optional[int]:
+    # A list of parameter tuples runs the statement through executemany
+    if isinstance(params, list):
+        conn.executemany(sql, params)
+        return None
+    row = conn.execute(sql, params).fetchone()
+    return row[0] if row else None
+
+
+def _apply_batch(conn: sqlite3.Connection, statements: list) -> list:
+    """Run write statements in one transaction.
+
+    Returns the first column of the row each statement RETURNs, or None
+    for statements without a RETURNING clause. If the transaction fails,
+    it is rolled back and every statement is retried in a transaction of
+    its own; a statement that still fails gets its exception in place of
+    a result, so only that caller sees the error.
     """
-    )
-    # Add reply_id column if it doesn't exist (migration)
     try:
-        await db.execute("ALTER TABLE messages ADD COLUMN reply_id INTEGER")
-    except:
-        pass
-
-    await db.execute(
-        """
-        CREATE TABLE IF NOT EXISTS settings (
-            key TEXT PRIMARY KEY,
-            value TEXT
-        )
-    """
-    )
-    await db.execute(
-        """
-        CREATE INDEX IF NOT EXISTS idx_messages_channel ON messages(channel)
-    """
-    )
-    await db.execute(
-        """
-        CREATE INDEX IF NOT EXISTS idx_messages_sender_receiver ON messages(sender, receiver)
-    """
-    )
-    await db.execute(
-        """
-        CREATE INDEX IF NOT EXISTS idx_messages_packet_id ON messages(packet_id)
-    """
-    )
-    await db.execute(
-        """
-        CREATE INDEX IF NOT EXISTS idx_messages_reply_id ON messages(reply_id)
+        results = [_run_statement(conn, sql, params) for sql, params in statements]
+        conn.commit()
+        return results
+    except Exception:
+        conn.rollback()
+        if len(statements) == 1:
+            raise
+    except BaseException:
+        conn.rollback()
+        raise
+
+    results = []
+    for sql, params in statements:
+        try:
+            results.append(_run_statement(conn, sql, params))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            results.append(e)
+    return results
+
+
+async def _write(sql: str, params: tuple) -> Optional[int]:
+    """Queue a write and wait until the batch it lands in is committed.
+
+    Returns the value of a RETURNING clause, if the statement has one.
     """
+    global _write_queue, _writer_task
+    if _writer_task is None:
+        _write_queue = asyncio.Queue()
+        _writer_task = asyncio.create_task(_writer_loop())
+    future = asyncio.get_running_loop().create_future()
+    _write_queue.put_nowait((sql, params, future))
+    return await future
+
+
+async def _writer_loop():
+    """Drain the write queue, committing up to WRITE_BATCH_SIZE writes at once"""
+    running = True
+    while running:
+        batch = [await _write_queue.get()]
+        # Give a burst a moment to accumulate before opening the transaction
+        await asyncio.sleep(WRITE_BATCH_DELAY)
+        while len(batch) < WRITE_BATCH_SIZE and not _write_queue.empty():
+            batch.append(_write_queue.get_nowait())
+        # None is the shutdown sentinel queued by close_db()
+        if None in batch:
+            running = False
+            batch = [item for item in batch if item is not None]
+        if not batch:
+            continue
+
+        db = await get_writer()
+        try:
+            results = await db.run(
+                _apply_batch, [(sql, params) for sql, params, _ in batch]
+            )
+        except Exception as e:
+            logger.error(f"Write batch failed: {e}")
+            for _, _, future in batch:
+                _set_exception(future, e)
+            continue
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                _set_exception(future, result)
+            else:
+                _set_result(future, result)
+
+
+async def close_db():
+    global _writer, _readers, _checkpoint_task, _write_queue, _writer_task
+    # Flush queued writes before the connection goes away
+    if _writer_task:
+        _write_queue.put_nowait(None)
+        await _writer_task
+        _write_queue = None
+        _writer_task = None
+    if _writer is None:
+        return
+    async with _lock:
+        if _checkpoint_task:
+            _checkpoint_task.cancel()
+            _checkpoint_task = None
+        for conn in _readers:
+            await conn.close()
+        _readers = []
+        if _writer:
+            await _writer.close()
+            _writer = None
+
+
+_SCHEMA: Final[str] = """
+BEGIN;
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    packet_id INTEGER,
+    sender TEXT NOT NULL,
+    receiver TEXT,
+    channel INTEGER DEFAULT 0,
+    text TEXT NOT NULL,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    ack_status TEXT DEFAULT 'pending',
+    is_outgoing INTEGER DEFAULT 0,
+    reply_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_messages_packet_id ON messages(packet_id);
+CREATE INDEX IF NOT EXISTS idx_messages_reply_id ON messages(reply_id);
+-- Composite indexes let the newest-first queries in get_messages walk the
+-- index backwards and stop after `limit` rows instead of sorting
+CREATE INDEX IF NOT EXISTS idx_messages_channel_id ON messages(channel, id DESC);
+CREATE INDEX IF NOT EXISTS idx_messages_sender_receiver_id ON messages(sender, receiver, id DESC);
+-- Superseded by the composites above; every extra index slows down inserts
+DROP INDEX IF EXISTS idx_messages_channel;
+DROP INDEX IF EXISTS idx_messages_sender_receiver;
+COMMIT;
+"""
+
+
+async def init_db():
+    db = await get_writer()
+    await db.run(_create_schema)
+
+
+def _create_schema(conn: sqlite3.Connection):
+    _migrate(conn)
+    conn.executescript(_SCHEMA)
+
+
+def _migrate(conn: sqlite3.Connection):
+    """Bring databases created by older versions up to the current schema"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+    # Add reply_id column if it doesn't exist; must run before the schema
+    # script because idx_messages_reply_id depends on it
+    if columns and "reply_id" not in columns:
+        try:
+            conn.execute("ALTER TABLE messages ADD COLUMN reply_id INTEGER")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"reply_id migration failed: {e}")
+
+
+def _message_params(
+    packet_id: Optional[int],
+    sender: str,
+    receiver: Optional[str],
+    channel: int,
+    text: str,
+    is_outgoing: bool = False,
+    ack_status: str = "pending",
+    reply_id: Optional[int] = None,
+) -> tuple:
+    return (
+        packet_id,
+        sender,
+        receiver,
+        channel,
+        text,
+        is_outgoing,
+        ack_status,
+        reply_id,
     )
-    await db.commit()
 
 
 async def save_message(
@@ -90,81 +397,104 @@ async def save_message(
     ack_status: str = "pending",
     reply_id: Optional[int] = None,
 ) -> int:
-    db = await get_db()
-    cursor = await db.execute(
-        """INSERT INTO messages (packet_id, sender, receiver, channel, text, is_outgoing, ack_status, reply_id)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-        (
-            packet_id,
-            sender,
-            receiver,
-            channel,
-            text,
-            int(is_outgoing),
-            ack_status,
-            reply_id,
+    return await _write(
+        _SQL_INSERT_MESSAGE,
+        _message_params(
+            packet_id, sender, receiver, channel, text, is_outgoing, ack_status, reply_id
         ),
     )
-    await db.commit()
-    return cursor.lastrowid
+
+
+async def save_messages(messages: List[dict]):
+    """Insert several messages with one executemany.
+
+    Each item holds save_message keyword arguments.
+    """
+    await _write(_SQL_INSERT_MESSAGES, [_message_params(**m) for m in messages])
 
 
 async def update_message_ack(packet_id: int, ack_status: str):
-    db = await get_db()
-    await db.execute(
-        "UPDATE messages SET ack_status = ? WHERE packet_id = ?",
+    await _write(
+        _SQL_UPDATE_ACK,
         (ack_status, packet_id),
     )
-    await db.commit()
 
 
-async def get_messages(
+async def update_message_acks(acks: List[dict]):
+    """Apply several update_message_ack keyword-argument dicts with one executemany"""
+    await _write(_SQL_UPDATE_ACK, [(a["ack_status"], a["packet_id"]) for a in acks])
+
+
+async def iter_messages(
     channel: Optional[int] = None,
     dm_partner: Optional[str] = None,
     my_node_id: Optional[str] = None,
     limit: int = 100,
-):
-    db = await get_db()
+) -> AsyncIterator[tuple]:
+    """Yield the latest `limit` messages oldest-first as raw row tuples.
+
+    Values are in MESSAGE_COLUMNS order. Rows are pulled MESSAGE_FETCH_SIZE
+    at a time, so memory stays flat regardless of `limit` and the caller
+    can start encoding right away.
+    """
     if dm_partner and my_node_id:
-        cursor = await db.execute(
-            """SELECT * FROM messages
-               WHERE channel = 0 AND (
-                   (sender = ? AND receiver = ?) OR
-                   (sender = ? AND receiver = ?)
-               )
-               ORDER BY timestamp DESC LIMIT ?""",
-            (my_node_id, dm_partner, dm_partner, my_node_id, limit),
-        )
+        sql = _SQL_MESSAGES_DM
+        params = (my_node_id, dm_partner, dm_partner, my_node_id, limit)
     elif dm_partner:
-        cursor = await db.execute(
-            """SELECT * FROM messages
-               WHERE (sender = ? OR receiver = ?) AND channel = 0
-               ORDER BY timestamp DESC LIMIT ?""",
-            (dm_partner, dm_partner, limit),
-        )
+        sql = _SQL_MESSAGES_PARTNER
+        params = (dm_partner, dm_partner, limit)
     elif channel is not None:
-        cursor = await db.execute(
-            "SELECT * FROM messages WHERE channel = ? ORDER BY timestamp DESC LIMIT ?",
-            (channel, limit),
-        )
+        sql = _SQL_MESSAGES_CHANNEL
+        params = (channel, limit)
     else:
-        cursor = await db.execute(
-            "SELECT * FROM messages ORDER BY timestamp DESC LIMIT ?", (limit,)
-        )
-    rows = await cursor.fetchall()
-    return [dict(row) for row in reversed(rows)]
+        sql = _SQL_MESSAGES_ALL
+        params = (limit,)
+
+    db = await get_reader()
+    cursor, rows = await db.run(_query_first_chunk, sql, params)
+    try:
+        while rows:
+            for row in rows:
+                yield row
+            rows = await db.run(_fetch_chunk, cursor)
+    finally:
+        await db.run(_close_cursor, cursor)
+
+
+async def get_messages(
+    channel: Optional[int] = None,
+    dm_partner: Optional[str] = None,
+    my_node_id: Optional[str] = None,
+    limit: int = 100,
+) -> List[dict]:
+    return [
+        dict(zip(MESSAGE_COLUMNS, row))
+        async for row in iter_messages(channel, dm_partner, my_node_id, limit)
+    ]
 
 
 async def save_setting(key: str, value: str):
-    db = await get_db()
-    await db.execute(
-        "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value)
-    )
-    await db.commit()
+    await _write(_SQL_SAVE_SETTING, (key, value))
 
 
 async def get_setting(key: str) -> Optional[str]:
-    db = await get_db()
-    cursor = await db.execute("SELECT value FROM settings WHERE key = ?", (key,))
-    row = await cursor.fetchone()
+    db = await get_reader()
+    return await db.run(_fetch_setting, key)
+
+
+def _query_first_chunk(conn: sqlite3.Connection, sql: str, params: tuple):
+    cursor = conn.execute(sql, params)
+    return cursor, cursor.fetchmany(MESSAGE_FETCH_SIZE)
+
+
+def _fetch_chunk(conn: sqlite3.Connection, cursor: sqlite3.Cursor) -> list:
+    return cursor.fetchmany(MESSAGE_FETCH_SIZE)
+
+
+def _close_cursor(conn: sqlite3.Connection, cursor: sqlite3.Cursor):
+    cursor.close()
+
+
+def _fetch_setting(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute(_SQL_GET_SETTING, (key,)).fetchone()
     return row[0] if row else None
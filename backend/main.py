@@ -4,12 +4,13 @@ import json
 import sys
 import os
 import webbrowser
+import orjson
 from pathlib import Path
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 try:
     from serial.tools import list_ports
 except Exception:
@@ -17,7 +18,7 @@ except Exception:
 
 from schemas import ConnectRequest, MessageRequest, TracerouteRequest, ConnectionStatus
 from meshtastic_manager import mesh_manager
-from websocket_manager import ws_manager
+from websocket_manager import ws_manager, encode_message, PING_FRAME
 import database as db
 
 logging.basicConfig(level=logging.INFO)
@@ -68,6 +69,7 @@ async def lifespan(app: FastAPI):
     yield
 
     mesh_manager.disconnect()
+    await mesh_manager.cleanup()
     await ws_manager.cleanup()
     await db.close_db()
 
@@ -92,15 +94,19 @@ app.add_middleware(
 async def websocket_endpoint(websocket: WebSocket):
     await ws_manager.connect(websocket)
     try:
-        await websocket.send_json(
-            {"type": "connection_status", "data": mesh_manager.get_status()}
+        await websocket.send_text(
+            encode_message({"type": "connection_status", "data": mesh_manager.get_status()})
         )
+        if mesh_manager.connected:
+            await websocket.send_text(
+                encode_message({"type": "nodes_snapshot_columnar", "data": mesh_manager.get_nodes_columnar()})
+            )
 
         while True:
             try:
                 await asyncio.wait_for(websocket.receive_text(), timeout=30)
             except asyncio.TimeoutError:
-                await websocket.send_json({"type": "ping"})
+                await websocket.send_text(PING_FRAME)
     except WebSocketDisconnect:
         ws_manager.disconnect(websocket)
     except Exception:
@@ -148,9 +154,9 @@ async def disconnect():
 
 
 @app.get("/api/ble-scan")
-async def scan_ble_devices():
+async def scan_ble_devices(timeout: float = Query(3.0, gt=0, le=30)):
     """Scan for available BLE Meshtastic devices."""
-    devices = mesh_manager.scan_ble_devices()
+    devices = await asyncio.to_thread(mesh_manager.scan_ble_devices, timeout)
     return {"devices": devices}
 
 
@@ -185,14 +191,15 @@ async def get_status():
 
 @app.get("/api/nodes")
 async def get_nodes():
-    if not mesh_manager.connected:
+    # Serve the last known nodes while a dropped TCP link is being restored
+    if not mesh_manager.connected and not mesh_manager.has_nodes_snapshot:
         raise HTTPException(status_code=400, detail="Not connected")
     return mesh_manager.get_nodes()
 
 
 @app.get("/api/node/{node_id}")
 async def get_node(node_id: str):
-    if not mesh_manager.connected:
+    if not mesh_manager.connected and not mesh_manager.has_nodes_snapshot:
         raise HTTPException(status_code=400, detail="Not connected")
     node = mesh_manager.get_node(node_id)
     if not node:
@@ -265,13 +272,36 @@ async def set_favorite(node_id: str, is_favorite: bool = Query(...)):
     return {"success": True, "node_id": node_id, "is_favorite": is_favorite}
 
 
+async def _stream_messages(first_row, rows, chunk_size: int = db.MESSAGE_FETCH_SIZE):
+    """Encode message rows as a JSON array, one orjson call per chunk"""
+    columns = db.MESSAGE_COLUMNS
+    chunk = [dict(zip(columns, first_row))]
+    prefix = b"["
+    async for row in rows:
+        chunk.append(dict(zip(columns, row)))
+        if len(chunk) >= chunk_size:
+            # Strip the brackets orjson adds so chunks splice into one array
+            yield prefix + orjson.dumps(chunk)[1:-1]
+            prefix = b","
+            chunk = []
+    if chunk:
+        yield prefix + orjson.dumps(chunk)[1:-1]
+        prefix = b","
+    yield b"]" if prefix == b"," else b"[]"
+
+
 @app.get("/api/messages")
 async def get_messages(channel: int = None, dm_partner: str = None, limit: int = 100):
     my_node_id = mesh_manager.my_node_id
-    messages = await db.get_messages(
+    messages = db.iter_messages(
         channel=channel, dm_partner=dm_partner, my_node_id=my_node_id, limit=limit
     )
-    return messages
+    # Run the query before any headers go out, so a database error is still a 500
+    try:
+        first_row = await messages.__anext__()
+    except StopAsyncIteration:
+        return Response(b"[]", media_type="application/json")
+    return StreamingResponse(_stream_messages(first_row, messages), media_type="application/json")
 
 
 # Монтируем статические файлы (React build)
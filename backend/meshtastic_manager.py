@@ -1,52 +1,299 @@
-import asyncio
-import logging
-import time
-from typing import Optional, Dict, Any, Set, List
-from concurrent.futures import Future
-from pubsub import pub
-import meshtastic
-import meshtastic.serial_interface
-import meshtastic.tcp_interface
+import asyncio
+import logging
+import sys
+import time
+from typing import Optional, Dict, Any, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from pubsub import pub
+import meshtastic
+import meshtastic.serial_interface
+import meshtastic.tcp_interface
 import meshtastic.ble_interface
+from meshtastic import mesh_pb2, portnums_pb2, telemetry_pb2
 from google.protobuf.json_format import MessageToDict
 
-from websocket_manager import ws_manager
+from websocket_manager import ws_manager, encode_message
 import database as db
 
 logger = logging.getLogger(__name__)
 
-
-class MeshtasticManager:
-    def __init__(self):
-        self.interface: Optional[meshtastic.mesh_interface.MeshInterface] = None
-        self.connection_type: Optional[str] = None
-        self.address: Optional[str] = None
-        self._loop: Optional[asyncio.AbstractEventLoop] = None
-        self._pending_tasks: Set[Future] = set()
-        self._ble_devices_cache: Dict[str, Any] = {}  # Cache BLEDevice objects from scan
-        self._connect_error: Optional[str] = None
-        self._connect_event: Optional[asyncio.Event] = None
-        self._connect_thread: Optional["threading.Thread"] = None
-
-    def set_loop(self, loop: asyncio.AbstractEventLoop):
-        self._loop = loop
-
-    def _run_async(self, coro):
-        """Safely schedule coroutine from sync callback"""
+# Seconds a scanned BLEDevice handle stays usable for connecting
+BLE_CACHE_TTL = 45.0
+
+# Keys a reply reference may arrive under, checked in decoded then packet
+_REPLY_KEYS = ("replyId", "reply_id", "replyTo")
+
+# Traceroute hop placeholders: 0 and 0xFFFFFFFF mark unknown/encrypted nodes
+_INVALID_NODES = frozenset((0, 0xFFFFFFFF))
+
+# On free-threaded builds (PEP 703) packet handlers can run in parallel,
+# one single-thread worker per shard so each sender's packets stay in order
+FREE_THREADED = not getattr(sys, "_is_gil_enabled", lambda: True)()
+HANDLER_WORKERS = 4
+
+# Seconds to wait before each TCP reconnect attempt after the link drops
+RECONNECT_BACKOFF = (0, 1, 2, 4, 8, 16)
+
+
+def _status_frame(data: dict) -> str:
+    return encode_message({"type": "connection_status", "data": data})
+
+
+# connection_status payloads that never change, encoded once
+_STATUS_BLE_CONNECTING = _status_frame({"connected": False, "connecting": True, "message": "BLE connecting (scanning...)"})
+_STATUS_RECONNECTING = _status_frame({"connected": False, "reconnecting": True})
+_STATUS_RECONNECT_FAILED = _status_frame({"connected": False, "reconnecting": False})
+
+# Pending database writes past which ack updates are dropped; saved
+# messages are always queued so chat history is never lost
+DB_QUEUE_SIZE = 1024
+# Window for coalescing a burst of writes (e.g. the backlog replayed on connect)
+DB_COALESCE_DELAY = 0.02
+# Queued op -> bulk database call, in the order each batch applies them;
+# saves go first so an ack in the same batch finds its message
+_DB_BATCH_OPS = (
+    ("save_message", db.save_messages),
+    ("update_message_ack", db.update_message_acks),
+)
+
+_SCALARS = (str, int, float, bool)
+
+_HW_MODEL_NAMES = {v.number: v.name for v in mesh_pb2.HardwareModel.DESCRIPTOR.values}
+
+
+def _short_float(value: float) -> float:
+    # float32 fields widen to e.g. 3.700000047683716; MessageToDict prints 3.7
+    return float(f"{value:.7g}")
+
+
+def _user_to_dict(user) -> dict:
+    out = {}
+    if user.id:
+        out["id"] = user.id
+    if user.long_name:
+        out["longName"] = user.long_name
+    if user.short_name:
+        out["shortName"] = user.short_name
+    if user.hw_model:
+        out["hwModel"] = _HW_MODEL_NAMES.get(user.hw_model, user.hw_model)
+    return out
+
+
+def _position_to_dict(position) -> dict:
+    out = {}
+    if position.HasField("latitude_i"):
+        out["latitudeI"] = position.latitude_i
+        out["latitude"] = position.latitude_i * 1e-7
+    if position.HasField("longitude_i"):
+        out["longitudeI"] = position.longitude_i
+        out["longitude"] = position.longitude_i * 1e-7
+    if position.HasField("altitude"):
+        out["altitude"] = position.altitude
+    if position.time:
+        out["time"] = position.time
+    return out
+
+
+def _metrics_to_dict(metrics) -> dict:
+    out = {}
+    if metrics.HasField("battery_level"):
+        out["batteryLevel"] = metrics.battery_level
+    if metrics.HasField("voltage"):
+        out["voltage"] = _short_float(metrics.voltage)
+    if metrics.HasField("channel_utilization"):
+        out["channelUtilization"] = _short_float(metrics.channel_utilization)
+    if metrics.HasField("air_util_tx"):
+        out["airUtilTx"] = _short_float(metrics.air_util_tx)
+    return out
+
+
+# Direct field access for the small messages found in every node entry;
+# only the fields the frontend reads are kept. Anything else goes through
+# MessageToDict's reflection.
+_PROTO_TO_DICT = {
+    mesh_pb2.User: _user_to_dict,
+    mesh_pb2.Position: _position_to_dict,
+    telemetry_pb2.DeviceMetrics: _metrics_to_dict,
+}
+
+
+def deep_convert(obj):
+    """Convert protobuf messages nested anywhere in obj into plain dicts.
+
+    Walks an explicit worklist instead of recursing, and converts each
+    message object once even when it is referenced from several places.
+    """
+    if obj is None or isinstance(obj, _SCALARS):
+        return obj
+    memo: Dict[int, dict] = {}
+    root = [obj]
+    stack = [(root, 0, obj)]
+    while stack:
+        parent, key, value = stack.pop()
+        if hasattr(value, "DESCRIPTOR"):
+            converted = memo.get(id(value))
+            if converted is None:
+                converted = memo[id(value)] = _PROTO_TO_DICT.get(type(value), MessageToDict)(value)
+            parent[key] = converted
+        elif isinstance(value, (dict, list)):
+            # Copy first so dict key order survives the out-of-order fill
+            out = value.copy()
+            parent[key] = out
+            items = out.items() if isinstance(out, dict) else enumerate(out)
+            stack.extend((out, k, v) for k, v in items if v is not None and not isinstance(v, _SCALARS))
+    return root[0]
+
+
+def _close_opened_interface(opening: "asyncio.Future"):
+    if opening.cancelled() or opening.exception() is not None:
+        return
+    try:
+        opening.result().close()
+    except Exception as e:
+        logger.debug(f"Closing abandoned interface: {e}")
+
+
+class MeshtasticManager:
+    # pubsub topic -> name of the handler method subscribed while connected.
+    # Only the receive subtopics we dispatch on are subscribed, so pubsub does
+    # not call into us for every other packet type (nodeinfo, admin, ...)
+    _TOPIC_HANDLERS = (
+        ("meshtastic.receive.text", "_on_receive"),
+        ("meshtastic.receive.position", "_on_receive"),
+        ("meshtastic.receive.routing", "_on_receive"),
+        ("meshtastic.receive.telemetry", "_on_receive"),
+        ("meshtastic.receive.traceroute", "_on_receive"),
+        ("meshtastic.connection.established", "_on_connection"),
+        ("meshtastic.connection.lost", "_on_connection_lost"),
+        ("meshtastic.node.updated", "_on_node_updated"),
+    )
+
+    def __init__(self):
+        self.interface: Optional[meshtastic.mesh_interface.MeshInterface] = None
+        self.connection_type: Optional[str] = None
+        self.address: Optional[str] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._db_queue: Optional[asyncio.Queue] = None
+        self._db_task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        # Bumped by every user disconnect/connect; a reconnect attempt that
+        # finishes under an older generation has been superseded
+        self._generation = 0
+        self._my_node_id: Optional[str] = None  # "!xxxxxxxx", formatted once per connection
+        # interface.nodes as it was when the link dropped; served while reconnecting
+        self._last_nodes_snapshot: Optional[Dict[str, dict]] = None
+        # ((connection_type, address), encoded "connected" status) of the last connection
+        self._connected_status: Optional[Tuple[tuple, str]] = None
+        self._handler_pools: Tuple[ThreadPoolExecutor, ...] = ()
+        # portnum -> handler(packet, decoded)
+        self._dispatch = {
+            sys.intern(portnum): handler
+            for portnum, handler in (
+                ("ROUTING_APP", self._handle_routing),
+                ("TRACEROUTE_APP", self._handle_traceroute_response),
+                ("TEXT_MESSAGE_APP", self._handle_text_message),
+                ("POSITION_APP", self._handle_position),
+                ("TELEMETRY_APP", self._handle_telemetry),
+            )
+        }
+        if FREE_THREADED:
+            self._handler_pools = tuple(
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"meshtastic-handler-{i}")
+                for i in range(HANDLER_WORKERS)
+            )
+        self._ble_devices_cache: Dict[str, Tuple[float, Any]] = {}  # (scanned_at, BLEDevice) from scan
+        self._connect_error: Optional[str] = None
+        self._connect_task: Optional[asyncio.Task] = None
+        # node num -> (version, formatted node); see _format_node
+        self._format_cache: Dict[int, Tuple[tuple, dict]] = {}
+
+    def set_loop(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._db_queue = asyncio.Queue()
+        self._db_task = loop.create_task(self._drain_db_queue())
+
+    def _enqueue_db(self, op: str, **kwargs):
+        """Queue a database call from any thread; op names a function in database."""
         if self._loop and self._loop.is_running():
-            future = asyncio.run_coroutine_threadsafe(coro, self._loop)
-            self._pending_tasks.add(future)
-            future.add_done_callback(lambda f: self._pending_tasks.discard(f))
+            self._loop.call_soon_threadsafe(self._put_db, (op, kwargs))
+
+    def _put_db(self, item):
+        if item[0] != "save_message" and self._db_queue.qsize() >= DB_QUEUE_SIZE:
+            logger.warning(f"Database queue full, dropping {item[0]}")
+            return
+        self._db_queue.put_nowait(item)
+
+    async def _drain_db_queue(self):
+        queue = self._db_queue
+        while True:
+            batch = [await queue.get()]
+            await asyncio.sleep(DB_COALESCE_DELAY)
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+
+            groups: Dict[str, list] = {}
+            for item in batch:
+                # None is the shutdown sentinel queued by cleanup()
+                if item is not None:
+                    groups.setdefault(item[0], []).append(item[1])
+
+            # One executemany per op; issued together so the database writer
+            # commits them in a single transaction
+            calls = [(op, bulk) for op, bulk in _DB_BATCH_OPS if op in groups]
+            results = await asyncio.gather(
+                *(bulk(groups[op]) for op, bulk in calls),
+                return_exceptions=True,
+            )
+            failed = False
+            for (op, _), result in zip(calls, results):
+                # Later ops are redone too: an ack that ran before its message
+                # was re-inserted matched nothing (the updates are idempotent)
+                failed = failed or isinstance(result, Exception)
+                if failed:
+                    await self._retry_db_rows(op, groups[op])
+            if None in batch:
+                return
+
+    async def _retry_db_rows(self, op: str, rows: list):
+        # The bulk call failed as a whole; apply rows one by one so a single
+        # bad row does not take the rest of the batch down with it
+        results = await asyncio.gather(
+            *(getattr(db, op)(**kwargs) for kwargs in rows),
+            return_exceptions=True,
+        )
+        for kwargs, result in zip(rows, results):
+            if isinstance(result, Exception):
+                logger.error(f"Database {op} error: {result} ({kwargs})")
+
+    async def cleanup(self):
+        """Flush queued database writes and stop the drain task on shutdown"""
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        for pool in self._handler_pools:
+            await asyncio.to_thread(pool.shutdown)
+        if self._db_task is None:
+            return
+        # Let callbacks already handed over via call_soon_threadsafe reach the queue first
+        await asyncio.sleep(0)
+        await self._db_queue.put(None)
+        await self._db_task
+        self._db_task = None
 
     @property
     def connected(self) -> bool:
         return self.interface is not None
 
+    @property
+    def has_nodes_snapshot(self) -> bool:
+        return self._last_nodes_snapshot is not None
+
     @property
     def my_node_id(self) -> Optional[str]:
-        if self.interface and self.interface.myInfo:
-            return f"!{self.interface.myInfo.my_node_num:08x}"
-        return None
+        if not self.interface:
+            return None
+        if self._my_node_id is None and self.interface.myInfo:
+            self._my_node_id = f"!{self.interface.myInfo.my_node_num:08x}"
+        return self._my_node_id
 
     @property
     def my_node_num(self) -> Optional[int]:
@@ -84,16 +331,31 @@ class MeshtasticManager:
             self.interface = None
             return False
 
-    def scan_ble_devices(self) -> List[Dict[str, str]]:
+    def scan_ble_devices(self, timeout: float = 3.0) -> List[Dict[str, str]]:
         """Scan for available BLE Meshtastic devices.
 
+        Calls bleak's discover directly instead of BLEInterface.scan(), which
+        hardcodes a 10 second passive window. bleak's default active scan
+        gets scan responses sooner; passive mode is not offered because bleak
+        rejects it on macOS and on BlueZ without or_patterns.
+
+        Args:
+            timeout: Scan duration in seconds
+
         Returns:
             List of dicts with 'name' and 'address' keys
         """
+        ble = meshtastic.ble_interface
         try:
-            logger.info("Scanning for BLE devices (takes 10 seconds)...")
-            # Use standard meshtastic scan - finds both advertising and paired devices
-            devices = meshtastic.ble_interface.BLEInterface.scan()
+            logger.info(f"Scanning for BLE devices (takes {timeout:g} seconds)...")
+            with ble.BLEClient() as client:
+                response = client.discover(
+                    timeout=timeout,
+                    return_adv=True,
+                    service_uuids=[ble.SERVICE_UUID],
+                )
+            # bleak sometimes returns devices we didn't ask for, keep true Meshtastic ones
+            devices = [device for device, adv in response.values() if ble.SERVICE_UUID in adv.service_uuids]
 
             # Clear old cache and store fresh BLEDevice objects
             self._ble_devices_cache.clear()
@@ -101,7 +363,7 @@ class MeshtasticManager:
             results = []
             for device in devices:
                 # Cache the BLEDevice object for later use
-                self._ble_devices_cache[device.address] = device
+                self._ble_devices_cache[device.address] = (time.monotonic(), device)
 
                 results.append({
                     "name": device.name or f"Unknown ({device.address})",
@@ -114,12 +376,13 @@ class MeshtasticManager:
             logger.error(f"BLE scan error: {e}")
             return []
 
-    def connect_ble(self, address: str) -> bool:
-        """Connect to a Meshtastic device via BLE.
-
-        Note: BLE library always does a 10-second scan before connecting,
-        even when address is known (recommended by Bleak docs).
-        This is run in a separate thread to avoid blocking.
+    def connect_ble(self, address: str) -> bool:
+        """Connect to a Meshtastic device via BLE.
+
+        Note: BLE library always does a 10-second scan before connecting,
+        even when address is known (recommended by Bleak docs).
+        Blocking library calls are offloaded with asyncio.to_thread from a
+        task on the event loop; await wait_for_connection() for the result.
 
         Args:
             address: BLE device address (MAC address like F4:12:FA:D0:45:AB)
@@ -127,141 +390,137 @@ class MeshtasticManager:
         Returns:
             True if connection initiated (actual connection happens async)
         """
-        self.disconnect()
-        # Subscribe before opening interface to catch queued messages delivered immediately on connect
-        self._setup_callbacks()
-        self._connect_error = None
-        # Event is used to signal wait_for_connection from the connect thread
-        try:
-            if self._loop:
-                self._connect_event = asyncio.Event()
-        except Exception:
-            self._connect_event = None
-
-        # Notify that connection is starting
-        ws_manager.broadcast_sync({
-            "type": "connection_status",
-            "data": {"connected": False, "connecting": True, "message": "BLE connecting (scanning...)"}
-        })
+        self.disconnect()
+        # Subscribe before opening interface to catch queued messages delivered immediately on connect
+        self._setup_callbacks()
+        self._connect_error = None
+
+        # Notify that connection is starting
+        ws_manager.broadcast_sync_encoded(_STATUS_BLE_CONNECTING)
+
+        self._connect_task = self._loop.create_task(self._connect_ble_async(address))
+
+        # Return True immediately - connection happens in background
+        return True
+
+    def _open_ble_interface(self, address: str):
+        """Blocking BLEInterface construction, run off the event loop."""
+        # Check if we have a cached BLEDevice from recent scan; on a miss scan
+        # once ourselves so the result is written through to the cache
+        cached_device = self._get_cached_ble_device(address)
+        if not cached_device:
+            self.scan_ble_devices()
+            cached_device = self._get_cached_ble_device(address)
+
+        if not cached_device:
+            logger.info(f"BLE connecting to {address} (includes 10s scan)...")
+            return meshtastic.ble_interface.BLEInterface(
+                address=address,
+                noNodes=True,  # Skip NodeDB download
+                timeout=120,
+                debugOut=sys.stderr
+            )
+
+        logger.info(f"BLE connecting to {address} using cached device...")
+
+        # Simple monkey-patch to avoid re-scanning
+        original_find_device = meshtastic.ble_interface.BLEInterface.find_device
+        # Preserve the original signature to avoid TypeError when the library
+        # passes extra kwargs like timeout/exit_on_error
+        def _use_cached_device(self, addr=None, *args, **kwargs):
+            return cached_device
+
+        meshtastic.ble_interface.BLEInterface.find_device = _use_cached_device
+        try:
+            return meshtastic.ble_interface.BLEInterface(
+                address=address,
+                noNodes=True,  # Skip NodeDB download for faster connection
+                timeout=120,
+                debugOut=sys.stderr
+            )
+        finally:
+            meshtastic.ble_interface.BLEInterface.find_device = original_find_device
+
+    def _get_cached_ble_device(self, address: str):
+        entry = self._ble_devices_cache.get(address)
+        if entry and time.monotonic() - entry[0] < BLE_CACHE_TTL:
+            return entry[1]
+        return None
+
+    async def _connect_ble_async(self, address: str) -> bool:
+        # Cancelling the await cannot stop the worker thread, so keep hold of
+        # its result to close an interface nobody is waiting for any more
+        opening = asyncio.ensure_future(asyncio.to_thread(self._open_ble_interface, address))
+        try:
+            self.interface = await asyncio.shield(opening)
+            logger.info("BLE connected successfully")
+
+            # Follow library docs: wait for full connection, then config
+            try:
+                wait_for_connected = getattr(self.interface, "waitForConnected", None)
+                if callable(wait_for_connected):
+                    await asyncio.to_thread(wait_for_connected, timeout=60)
+            except Exception as conn_err:
+                raise RuntimeError(f"BLE waitForConnected failed: {conn_err}") from conn_err
+
+            try:
+                wait_for_config = getattr(self.interface, "waitForConfig", None)
+                if callable(wait_for_config):
+                    await asyncio.to_thread(wait_for_config, timeout=30)
+            except Exception as config_err:
+                logger.debug(f"BLE waitForConfig failed/ignored: {config_err}")
+
+            self.connection_type = "ble"
+            self.address = address
+            logger.info(f"Connected via BLE: {address}")
+
+            # Proactively notify clients in case the library event does not fire
+            await ws_manager.broadcast_encoded(self._connected_frame())
+            # Successful connection notification will be sent by _on_connection callback
+            return True
+        except asyncio.CancelledError:
+            # wait_for_connection timed out: close the interface whenever it
+            # is (or was already) created, and forget it here
+            opening.add_done_callback(_close_opened_interface)
+            self._unsubscribe_all()
+            self.interface = None
+            raise
+        except Exception as e:
+            self._connect_error = str(e)
+            logger.error(f"BLE connection error: {e}")
+            self._unsubscribe_all()
+            self.interface = None
+            # Notify about failed connection
+            await ws_manager.broadcast({
+                "type": "connection_status",
+                "data": {"connected": False, "connecting": False, "error": str(e)}
+            })
+            return False
+
+    async def wait_for_connection(self, timeout: float = 60.0) -> bool:
+        """Await the BLE connect task until it finishes or timeout expires."""
+        if self._connect_task is None:
+            return self.connected
+        try:
+            return await asyncio.wait_for(self._connect_task, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("BLE wait_for_connection timed out waiting for connect task")
+            return False
+
+    def get_connect_error(self) -> Optional[str]:
+        return self._connect_error
 
-        def _connect_thread():
-            try:
-                # Check if we have a cached BLEDevice from recent scan
-                cached_device = self._ble_devices_cache.get(address)
-
-                if cached_device:
-                    logger.info(f"BLE connecting to {address} using cached device...")
-
-                    # Simple monkey-patch to avoid re-scanning
-                    original_find_device = meshtastic.ble_interface.BLEInterface.find_device
-                    # Preserve the original signature to avoid TypeError when the library
-                    # passes extra kwargs like timeout/exit_on_error
-                    def _use_cached_device(self, addr=None, *args, **kwargs):
-                        return cached_device
-
-                    meshtastic.ble_interface.BLEInterface.find_device = _use_cached_device
-
-                    try:
-                        import sys
-                        self.interface = meshtastic.ble_interface.BLEInterface(
-                            address=address,
-                            noNodes=True,  # Skip NodeDB download for faster connection
-                            timeout=120,
-                            debugOut=sys.stderr
-                        )
-                        logger.info("BLE connected successfully")
-                    finally:
-                        meshtastic.ble_interface.BLEInterface.find_device = original_find_device
-                else:
-                    logger.info(f"BLE connecting to {address} (includes 10s scan)...")
-                    import sys
-                    self.interface = meshtastic.ble_interface.BLEInterface(
-                        address=address,
-                        noNodes=True,  # Skip NodeDB download
-                        timeout=120,
-                        debugOut=sys.stderr
-                    )
-                    logger.info("BLE connected successfully")
-
-                # Follow library docs: wait for full connection, then config
-                try:
-                    wait_for_connected = getattr(self.interface, "waitForConnected", None)
-                    if callable(wait_for_connected):
-                        wait_for_connected(timeout=60)
-                except Exception as conn_err:
-                    raise RuntimeError(f"BLE waitForConnected failed: {conn_err}") from conn_err
-
-                try:
-                    wait_for_config = getattr(self.interface, "waitForConfig", None)
-                    if callable(wait_for_config):
-                        wait_for_config(timeout=30)
-                except Exception as config_err:
-                    logger.debug(f"BLE waitForConfig failed/ignored: {config_err}")
-
-                self.connection_type = "ble"
-                self.address = address
-                logger.info(f"Connected via BLE: {address}")
-
-                # Proactively notify clients in case the library event does not fire
-                ws_manager.broadcast_sync({
-                    "type": "connection_status",
-                    "data": {"connected": True, "type": self.connection_type, "address": self.address}
-                })
-                if self._connect_event and self._loop:
-                    self._loop.call_soon_threadsafe(self._connect_event.set)
-                # Successful connection notification will be sent by _on_connection callback
-            except BaseException as e:
-                self._connect_error = str(e)
-                logger.error(f"BLE connection error: {e}")
-                self._unsubscribe_all()
-                self.interface = None
-                # Notify about failed connection
-                ws_manager.broadcast_sync({
-                    "type": "connection_status",
-                    "data": {"connected": False, "connecting": False, "error": str(e)}
-                })
-                if self._connect_event and self._loop:
-                    self._loop.call_soon_threadsafe(self._connect_event.set)
-
-        # Start connection in separate thread to avoid blocking FastAPI
-        import threading
-        self._connect_thread = threading.Thread(target=_connect_thread, daemon=True, name="meshtastic-ble-connect")
-        self._connect_thread.start()
-
-        # Return True immediately - connection happens in background
-        return True
-
-    async def wait_for_connection(self, timeout: float = 60.0) -> bool:
-        """Await until interface is ready or timeout expires."""
-        # Prefer event signaling from the connect thread
-        if self._connect_event:
-            try:
-                await asyncio.wait_for(self._connect_event.wait(), timeout=timeout)
-            except asyncio.TimeoutError:
-                logger.warning("BLE wait_for_connection timed out waiting for connect thread")
-                return False
-            if self._connect_error:
-                return False
-            return self.connected
-
-        # Fallback polling if event not available
-        end_time = time.monotonic() + timeout
-        while time.monotonic() < end_time:
-            if self.connected:
-                return True
-            if self._connect_error:
-                return False
-            await asyncio.sleep(0.25)
-        logger.warning("BLE wait_for_connection timeout (polling)")
-        return False
-
-    def get_connect_error(self) -> Optional[str]:
-        return self._connect_error
-
-    def disconnect(self):
-        if self.interface:
-            # Unsubscribe first to prevent reconnection attempts
-            self._unsubscribe_all()
+    def disconnect(self):
+        """Close the current connection and stop any pending TCP reconnect."""
+        self._generation += 1
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+            # Subscriptions of the lost connection are still active while reconnecting
+            self._unsubscribe_all()
+        if self.interface:
+            # Unsubscribe first to prevent reconnection attempts
+            self._unsubscribe_all()
             try:
                 self.interface.close()
             except Exception:
@@ -269,51 +528,56 @@ class MeshtasticManager:
             self.interface = None
             self.connection_type = None
             self.address = None
+            self._my_node_id = None
+            self._format_cache.clear()
+        self._last_nodes_snapshot = None
 
     def _setup_callbacks(self):
-        pub.subscribe(self._on_receive, "meshtastic.receive")
-        pub.subscribe(self._on_connection, "meshtastic.connection.established")
-        pub.subscribe(self._on_connection_lost, "meshtastic.connection.lost")
-        pub.subscribe(self._on_node_updated, "meshtastic.node.updated")
+        for topic, attr in self._TOPIC_HANDLERS:
+            pub.subscribe(getattr(self, attr), topic)
 
     def _unsubscribe_all(self):
-        topics = [
-            ("meshtastic.receive", self._on_receive),
-            ("meshtastic.connection.established", self._on_connection),
-            ("meshtastic.connection.lost", self._on_connection_lost),
-            ("meshtastic.node.updated", self._on_node_updated),
-        ]
-        for topic, handler in topics:
+        for topic, attr in self._TOPIC_HANDLERS:
             try:
-                pub.unsubscribe(handler, topic)
+                pub.unsubscribe(getattr(self, attr), topic)
             except Exception as e:
                 logger.debug(f"Unsubscribe {topic}: {e}")
 
     def _on_receive(self, packet, interface):
-        decoded = packet.get("decoded", {})
-        portnum = decoded.get("portnum")
-
-        if portnum == "ROUTING_APP":
-            self._handle_routing(packet)
-        elif portnum == "TRACEROUTE_APP":
-            self._handle_traceroute_response(packet)
-        elif portnum == "TEXT_MESSAGE_APP":
-            self._handle_text_message(packet)
-        elif portnum == "POSITION_APP":
-            self._handle_position(packet)
-        elif portnum == "TELEMETRY_APP":
-            self._handle_telemetry(packet)
-
-    def _handle_routing(self, packet):
-        request_id = packet.get("decoded", {}).get("requestId")
+        if self._handler_pools:
+            # Shard by sender: that node's messages, acks and traceroutes are
+            # handled (and broadcast/queued for the DB) in arrival order
+            shard = hash(packet.get("from")) % len(self._handler_pools)
+            self._handler_pools[shard].submit(self._dispatch_pooled, packet)
+        else:
+            self._dispatch_decoded(packet)
+
+    def _dispatch_pooled(self, packet):
+        # Pool futures are never awaited, so surface handler errors here
+        try:
+            self._dispatch_decoded(packet)
+        except Exception:
+            logger.exception("Packet handler error")
+
+    def _dispatch_decoded(self, packet):
+        # The library has already applied this packet to the sender's node,
+        # e.g. replaced its position or updated deviceMetrics in place
+        self._format_cache.pop(packet.get("from"), None)
+        decoded = packet.get("decoded") or {}
+        handler = self._dispatch.get(decoded.get("portnum"))
+        if handler is not None:
+            handler(packet, decoded)
+
+    def _handle_routing(self, packet, decoded):
+        request_id = decoded.get("requestId")
         if not request_id:
             return
 
-        routing = packet.get("decoded", {}).get("routing", {})
+        routing = decoded.get("routing", {})
         error_reason = routing.get("errorReason", "NONE")
         ack_status = "ack" if error_reason == "NONE" else "nak"
 
-        self._run_async(db.update_message_ack(request_id, ack_status))
+        self._enqueue_db("update_message_ack", packet_id=request_id, ack_status=ack_status)
 
         ws_manager.broadcast_sync({
             "type": "ack",
@@ -324,8 +588,7 @@ class MeshtasticManager:
             }
         })
 
-    def _handle_traceroute_response(self, packet):
-        decoded = packet.get("decoded", {})
+    def _handle_traceroute_response(self, packet, decoded):
         request_id = decoded.get("requestId")
         traceroute_data = decoded.get("traceroute", {})
 
@@ -338,16 +601,19 @@ class MeshtasticManager:
         # Source and destination are NOT included in the route array
         route = traceroute_data.get("route", [])
         route_back = traceroute_data.get("routeBack", [])
-        snr_towards = traceroute_data.get("snrTowards", [])
-        snr_back = traceroute_data.get("snrBack", [])
+        snr_towards = traceroute_data.get("snrTowards")
+        snr_back = traceroute_data.get("snrBack")
+        snr_towards = snr_towards if isinstance(snr_towards, list) else []
+        snr_back = snr_back if isinstance(snr_back, list) else []
 
-        # Filter out invalid node IDs (0xFFFFFFFF = 4294967295 = unknown/encrypted nodes)
-        if isinstance(route, list):
-            route = [node for node in route if node != 4294967295 and node != 0]
-        if isinstance(route_back, list):
-            route_back = [node for node in route_back if node != 4294967295 and node != 0]
+        # Filter out invalid node IDs (unknown/encrypted nodes)
+        if isinstance(route, list) and route:
+            route = [node for node in route if node not in _INVALID_NODES]
+        if isinstance(route_back, list) and route_back:
+            route_back = [node for node in route_back if node not in _INVALID_NODES]
 
-        logger.info(f"Traceroute response: from={packet.get('fromId')}, hops_forward={len(route)}, hops_back={len(route_back)}, route={route}, route_back={route_back}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Traceroute response: from={packet.get('fromId')}, hops_forward={len(route)}, hops_back={len(route_back)}, route={route}, route_back={route_back}")
 
         ws_manager.broadcast_sync({
             "type": "traceroute",
@@ -356,27 +622,25 @@ class MeshtasticManager:
                 "from": packet.get("fromId"),
                 "route": route,
                 "route_back": route_back,
-                "snr_towards": snr_towards if isinstance(snr_towards, list) else [],
-                "snr_back": snr_back if isinstance(snr_back, list) else []
+                "snr_towards": snr_towards,
+                "snr_back": snr_back
             }
         })
 
-    def _handle_text_message(self, packet):
-        decoded = packet.get("decoded", {})
+    def _handle_text_message(self, packet, decoded):
         text = decoded.get("text", "")
-        sender = packet.get("fromId", "unknown")
+        # fromId is present but None for senders the library does not know yet
+        sender = packet.get("fromId") or "unknown"
         receiver = packet.get("toId")
         channel = packet.get("channel", 0)
         packet_id = packet.get("id")
 
         # Robust reply_id extraction (can be in decoded or packet, as replyId or reply_id or replyTo)
-        reply_id = decoded.get("replyId") or decoded.get("reply_id") or decoded.get("replyTo")
-        if reply_id is None:
-            reply_id = packet.get("replyId") or packet.get("reply_id") or packet.get("replyTo")
+        reply_id = next((d[k] for d in (decoded, packet) for k in _REPLY_KEYS if d.get(k)), None)
 
         logger.info(f"Received message: id={packet_id}, sender={sender}, text={text[:20]}..., reply_id={reply_id}")
 
-        self._run_async(db.save_message(
+        self._enqueue_db("save_message",
             packet_id=packet_id,
             sender=sender,
             receiver=receiver if receiver != "^all" else None,
@@ -385,7 +649,7 @@ class MeshtasticManager:
             is_outgoing=False,
             ack_status="received",
             reply_id=reply_id
-        ))
+        )
 
         ws_manager.broadcast_sync({
             "type": "message",
@@ -402,8 +666,7 @@ class MeshtasticManager:
             }
         })
 
-    def _handle_position(self, packet):
-        decoded = packet.get("decoded", {})
+    def _handle_position(self, packet, decoded):
         position = decoded.get("position", {})
 
         ws_manager.broadcast_sync({
@@ -417,8 +680,7 @@ class MeshtasticManager:
             }
         })
 
-    def _handle_telemetry(self, packet):
-        decoded = packet.get("decoded", {})
+    def _handle_telemetry(self, packet, decoded):
         telemetry = decoded.get("telemetry", {})
 
         ws_manager.broadcast_sync({
@@ -430,77 +692,140 @@ class MeshtasticManager:
             }
         })
 
+    def _connected_frame(self) -> str:
+        # Re-encode only when the connection target changed
+        key = (self.connection_type, self.address)
+        if self._connected_status is None or self._connected_status[0] != key:
+            frame = _status_frame({"connected": True, "type": self.connection_type, "address": self.address})
+            self._connected_status = (key, frame)
+        return self._connected_status[1]
+
     def _on_connection(self, interface, topic=pub.AUTO_TOPIC):
-        ws_manager.broadcast_sync({
-            "type": "connection_status",
-            "data": {"connected": True, "type": self.connection_type, "address": self.address}
-        })
+        # Published while the interface constructor is still waiting for the
+        # config, so self.interface is not assigned yet: use the argument.
+        # Format our node id once per connection instead of on every send
+        my_info = interface.myInfo if interface else None
+        self._my_node_id = f"!{my_info.my_node_num:08x}" if my_info else None
+        ws_manager.broadcast_sync_encoded(self._connected_frame())
+
+        previous = self._last_nodes_snapshot
+        self._last_nodes_snapshot = None
+        if previous is not None:
+            # Reconnected: clients still show the old list, send only what changed
+            for key, node in ((interface.nodes if interface else None) or {}).items():
+                if previous.get(key) != node:
+                    ws_manager.broadcast_sync({"type": "node_update", "data": self._format_node(node)})
+            return
+
+        snapshot = self.get_nodes_columnar(interface)
+        if snapshot["nums"]:
+            ws_manager.broadcast_sync({"type": "nodes_snapshot_columnar", "data": snapshot})
 
     def _on_connection_lost(self, interface, topic=pub.AUTO_TOPIC):
+        # Closing an abandoned or superseded interface publishes this too
+        if interface is not self.interface:
+            return
         logger.warning(f"Connection lost to {self.address}")
-        ws_manager.broadcast_sync({
-            "type": "connection_status",
-            "data": {"connected": False, "reconnecting": True}
-        })
+        ws_manager.broadcast_sync_encoded(_STATUS_RECONNECTING)
 
         # Save connection info for reconnection
         saved_type = self.connection_type
         saved_address = self.address
 
-        # Clean up current interface
+        # Clean up current interface, keeping its nodes for the UI until we are back
         if self.interface:
+            if saved_type == "tcp" and self.interface.nodes:
+                self._last_nodes_snapshot = dict(self.interface.nodes)
             try:
                 self.interface.close()
             except Exception:
                 pass
         self.interface = None
+        self._my_node_id = None
+
+        # Attempt reconnection if it was TCP connection; the blocking connect runs
+        # from the event loop so this pubsub thread returns right away
+        if saved_type == "tcp" and saved_address and self._loop and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._start_reconnect, saved_address)
+
+    def _start_reconnect(self, address: str):
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = self._loop.create_task(self._reconnect_tcp(address))
+
+    async def _reconnect_tcp(self, address: str):
+        """Retry the dropped TCP link; cancelled by a user disconnect/connect."""
+        parts = address.split(":")
+        hostname = parts[0]
+        port = int(parts[1]) if len(parts) > 1 else 4403
+        generation = self._generation
+
+        for delay in RECONNECT_BACKOFF:
+            await asyncio.sleep(delay)
+            logger.info(f"Attempting to reconnect to {address}")
+            # Not connect_tcp: that is the user path and would cancel this task.
+            # The interface is only adopted back on the loop, after the checks below
+            opening = asyncio.ensure_future(asyncio.to_thread(
+                meshtastic.tcp_interface.TCPInterface, hostname=hostname, portNumber=port
+            ))
+            try:
+                interface = await asyncio.shield(opening)
+            except asyncio.CancelledError:
+                opening.add_done_callback(_close_opened_interface)
+                raise
+            except Exception as e:
+                logger.error(f"TCP reconnect error: {e}")
+                continue
+            if generation != self._generation or self.interface is not None:
+                # Superseded while the connect was in flight
+                opening.add_done_callback(_close_opened_interface)
+                return
+            self.interface = interface
+            self.connection_type = "tcp"
+            self.address = f"{hostname}:{port}"
+            logger.info(f"Reconnection successful to {address}")
+            return
 
-        # Attempt reconnection if it was TCP connection
-        if saved_type == "tcp" and saved_address:
-            logger.info(f"Attempting to reconnect to {saved_address}")
-            parts = saved_address.split(":")
-            hostname = parts[0]
-            port = int(parts[1]) if len(parts) > 1 else 4403
-
-            # Try to reconnect
-            success = self.connect_tcp(hostname, port)
-            if success:
-                logger.info(f"Reconnection successful to {saved_address}")
-            else:
-                logger.error(f"Reconnection failed to {saved_address}")
-                self.connection_type = None
-                self.address = None
+        logger.error(f"Reconnection failed to {address}")
+        self._unsubscribe_all()
+        self.connection_type = None
+        self.address = None
+        self._last_nodes_snapshot = None
+        await ws_manager.broadcast_encoded(_STATUS_RECONNECT_FAILED)
 
     def _on_node_updated(self, node, interface):
+        self._format_cache.pop(node.get("num"), None)
         ws_manager.broadcast_sync({
             "type": "node_update",
             "data": self._format_node(node)
         })
 
     def _format_node(self, node: dict) -> dict:
+        """Return the API view of a node, reusing the last one if unchanged.
+
+        The scalar fields make the version stamp. Changes to the nested
+        user/position/deviceMetrics dicts do not show up there, so the
+        entry is dropped instead for every packet received from the node
+        (_dispatch_decoded) and on node.updated.
+        """
+        num = node.get("num")
+        version = (node.get("lastHeard"), node.get("snr"), node.get("isFavorite"), node.get("is_favorite"))
+        cached = self._format_cache.get(num)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        formatted = self._build_node(node)
+        if num is not None:
+            self._format_cache[num] = (version, formatted)
+        return formatted
+
+    def _build_node(self, node: dict) -> dict:
         # Convert protobuf objects to dicts for JSON serialization
         user = node.get("user")
         position = node.get("position")
         device_metrics = node.get("deviceMetrics")
 
-        # Deep convert: check if converted dicts still have protobuf objects inside
-        def deep_convert(obj):
-            if obj is None:
-                return None
-            if hasattr(obj, 'DESCRIPTOR'):
-                obj = MessageToDict(obj)
-            if isinstance(obj, dict):
-                return {k: deep_convert(v) for k, v in obj.items()}
-            if isinstance(obj, list):
-                return [deep_convert(item) for item in obj]
-            return obj
-
         # Check if node is favorite - can be stored in different ways depending on meshtastic version
         is_favorite = False
-
-        # Debug: log available keys
-        node_id = node.get("user", {}).get("id") if user else None
-        logger.debug(f"Node {node_id} keys: {list(node.keys())}")
+        node_id = user.get("id") if user else None
 
         if "isFavorite" in node:
             is_favorite = node.get("isFavorite", False)
@@ -508,10 +833,12 @@ class MeshtasticManager:
         elif "is_favorite" in node:
             is_favorite = node.get("is_favorite", False)
 
-        logger.debug(f"Node {node_id} isFavorite: {is_favorite}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Node {node_id} keys: {list(node.keys())}")
+            logger.debug(f"Node {node_id} isFavorite: {is_favorite}")
 
         return {
-            "id": node.get("user", {}).get("id") if user else None,
+            "id": node_id,
             "num": node.get("num"),
             "user": deep_convert(user),
             "position": deep_convert(position),
@@ -522,17 +849,64 @@ class MeshtasticManager:
         }
 
     def get_nodes(self) -> list:
-        if not self.interface or not self.interface.nodes:
+        nodes = self.interface.nodes if self.interface else self._last_nodes_snapshot
+        if not nodes:
             return []
-        return [self._format_node(n) for n in self.interface.nodes.values()]
+        return [self._format_node(n) for n in nodes.values()]
 
-    def get_node(self, node_id: str) -> Optional[dict]:
-        if not self.interface or not self.interface.nodes:
+    def _find_node(self, node_id: str) -> Optional[dict]:
+        """Look up a raw node dict by user id ("!hex") or decimal node num."""
+        if not self.interface:
+            # While reconnecting only the id-keyed snapshot is available
+            return (self._last_nodes_snapshot or {}).get(node_id)
+        if not self.interface.nodes:
             return None
-        for node in self.interface.nodes.values():
-            if node.get("user", {}).get("id") == node_id or str(node.get("num")) == node_id:
-                return self._format_node(node)
-        return None
+        # The library already keys interface.nodes by user id and nodesByNum by num
+        node = self.interface.nodes.get(node_id)
+        if node is None and node_id.isdigit():
+            node = (self.interface.nodesByNum or {}).get(int(node_id))
+        return node
+
+    def get_nodes_columnar(self, interface=None) -> dict:
+        """All nodes as parallel arrays, one entry per node, built in a single pass.
+
+        Used for the snapshot pushed on connect: no per-node dicts on the way
+        out and far fewer repeated keys in the JSON. `interface` defaults to
+        the current one; _on_connection passes its own, as self.interface
+        is not assigned yet when that runs.
+        """
+        ids, nums, last_heard, snr, favorite = [], [], [], [], []
+        long_names, short_names, hw_models = [], [], []
+        lat, lon, alt = [], [], []
+        interface = interface or self.interface
+        nodes = interface.nodes if interface else None
+        for node in (nodes or {}).values():
+            user = node.get("user") or {}
+            position = node.get("position") or {}
+            ids.append(user.get("id"))
+            nums.append(node.get("num"))
+            last_heard.append(node.get("lastHeard"))
+            snr.append(node.get("snr"))
+            favorite.append(bool(node.get("isFavorite", node.get("is_favorite", False))))
+            long_names.append(user.get("longName"))
+            short_names.append(user.get("shortName"))
+            hw_models.append(user.get("hwModel"))
+            lat.append(position.get("latitude"))
+            lon.append(position.get("longitude"))
+            alt.append(position.get("altitude"))
+        return {
+            "ids": ids,
+            "nums": nums,
+            "lastHeard": last_heard,
+            "snr": snr,
+            "isFavorite": favorite,
+            "users": {"longName": long_names, "shortName": short_names, "hwModel": hw_models},
+            "positions": {"lat": lat, "lon": lon, "alt": alt},
+        }
+
+    def get_node(self, node_id: str) -> Optional[dict]:
+        node = self._find_node(node_id)
+        return self._format_node(node) if node is not None else None
 
     def get_channels(self) -> list:
         if not self.interface or not self.interface.localNode:
@@ -577,7 +951,7 @@ class MeshtasticManager:
             )
             packet_id = result.id if result else None
 
-            self._run_async(db.save_message(
+            self._enqueue_db("save_message",
                 packet_id=packet_id,
                 sender=self.my_node_id or "local",
                 receiver=destination_id,
@@ -586,7 +960,7 @@ class MeshtasticManager:
                 is_outgoing=True,
                 ack_status="pending",
                 reply_id=reply_id
-            ))
+            )
 
             return packet_id
         except Exception as e:
@@ -603,8 +977,6 @@ class MeshtasticManager:
         if not self.interface:
             return False
         try:
-            from meshtastic import mesh_pb2, portnums_pb2
-
             r = mesh_pb2.RouteDiscovery()
             self.interface.sendData(
                 r,
@@ -648,18 +1020,11 @@ class MeshtasticManager:
             node_hex = node_id if node_id.startswith("!") else f"!{node_id}"
 
             # Find and update the node in interface.nodes cache
-            if hasattr(self.interface, 'nodes') and self.interface.nodes:
-                for node_num, node_data in self.interface.nodes.items():
-                    # Get the node's user ID
-                    user_id = node_data.get("user", {}).get("id") if isinstance(node_data.get("user"), dict) else None
-                    if user_id == node_hex or user_id == node_id:
-                        # Update the isFavorite field in the cached node
-                        if "isFavorite" not in node_data:
-                            node_data["isFavorite"] = is_favorite
-                        else:
-                            node_data["isFavorite"] = is_favorite
-                        logger.debug(f"Updated local cache for node {node_id}: isFavorite={is_favorite}")
-                        break
+            node_data = self._find_node(node_hex) or self._find_node(node_id)
+            if node_data is not None:
+                # Update the isFavorite field in the cached node
+                node_data["isFavorite"] = is_favorite
+                logger.debug(f"Updated local cache for node {node_id}: isFavorite={is_favorite}")
 
             logger.info(f"Set favorite={is_favorite} for node {node_id}")
             return True
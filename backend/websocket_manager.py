@@ -1,52 +1,160 @@
 from fastapi import WebSocket
-from typing import Dict, Any, Set
-import json
+from typing import Dict, Any, Union
 import asyncio
 import logging
+from collections import deque
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Concurrent sends in flight per broadcast, and how long one client may take
+SEND_CONCURRENCY = 64
+SEND_TIMEOUT = 5.0
+# Most queued events folded into one {"type": "batch", "events": [...]} frame
+BATCH_MAX = 64
+# Keepalive sent to idle clients; constant, so it is encoded once here
+PING_FRAME = '{"type":"ping"}'
+# Pending broadcasts kept while clients are slow; past this the oldest
+# droppable event is discarded. Chat, acks and status are never dropped.
+QUEUE_MAX = 1024
+DROPPABLE_TYPES = frozenset({"position", "telemetry", "node_update"})
+
+
+# Naive datetimes are treated as UTC and written with a "Z" suffix
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for types the encoder cannot write itself.
+
+    orjson handles datetimes, UUIDs and dataclasses natively and only calls
+    this for anything else; protobuf messages are converted to dicts before
+    they are queued.
+    """
+    if hasattr(obj, "__dict__"):
+        return vars(obj)
+    return str(obj)
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    """Encode a message as JSON text"""
+    return orjson.dumps(message, default=_default, option=_ORJSON_OPTIONS).decode()
+
 
 class WebSocketManager:
     def __init__(self):
-        self.connections: list[WebSocket] = []
+        self.connections: set[WebSocket] = set()
+        self._send_sem = asyncio.Semaphore(SEND_CONCURRENCY)
         self._loop: asyncio.AbstractEventLoop | None = None
-        self._pending_futures: Set[asyncio.Future] = set()
+        # Messages handed over from meshtastic threads, broadcast in order by _consume
+        self._queue: deque = deque()
+        self._queue_ready: asyncio.Event | None = None
+        self._consumer_task: asyncio.Task | None = None
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.connections.append(websocket)
+        self.connections.add(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.connections:
-            self.connections.remove(websocket)
+        self.connections.discard(websocket)
 
     async def broadcast(self, message: Dict[str, Any]):
-        data = json.dumps(message, default=str)
-        disconnected = []
-        for conn in self.connections:
+        if not self.connections:
+            return
+        # Frontend parses text frames, so encode once as text for all clients
+        await self.broadcast_encoded(encode_message(message))
+
+    async def broadcast_encoded(self, data: str):
+        """Send an already JSON-encoded message to every client concurrently"""
+        connections = list(self.connections)
+        # One ASGI message shared by every send; Starlette only reads it
+        message = {"type": "websocket.send", "text": data}
+        results = await asyncio.gather(*(self._safe_send(conn, message) for conn in connections))
+        failed = {conn for conn, ok in zip(connections, results) if not ok}
+        if failed:
+            self.connections -= failed
+            # Close them too: an open socket that gets no events looks connected
+            # to the UI, while a closed one makes the frontend reconnect
+            await asyncio.gather(*(self._close(conn) for conn in failed))
+
+    @staticmethod
+    async def _close(conn: WebSocket):
+        try:
+            await asyncio.wait_for(conn.close(), timeout=SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    async def _safe_send(self, conn: WebSocket, message: Dict[str, Any]) -> bool:
+        # A slow client is dropped after SEND_TIMEOUT instead of stalling everyone
+        async with self._send_sem:
             try:
-                await conn.send_text(data)
+                await asyncio.wait_for(conn.send(message), timeout=SEND_TIMEOUT)
+                return True
             except Exception:
-                disconnected.append(conn)
-        for conn in disconnected:
-            self.disconnect(conn)
+                return False
 
     def broadcast_sync(self, message: Dict[str, Any]):
         """Sync wrapper for use in meshtastic callbacks"""
+        self._enqueue(message)
+
+    def broadcast_sync_encoded(self, data: str):
+        """Sync wrapper for broadcast_encoded, e.g. for payloads encoded once at import"""
+        self._enqueue(data)
+
+    def _enqueue(self, item: Union[Dict[str, Any], str]):
+        # Nobody is watching: skip the thread hop and the encode. A client
+        # that connects later is sent the current status and nodes on accept.
+        if not self.connections:
+            return
         if self._loop and self._loop.is_running():
-            future = asyncio.run_coroutine_threadsafe(self.broadcast(message), self._loop)
-            self._pending_futures.add(future)
-            future.add_done_callback(lambda f: self._pending_futures.discard(f))
+            self._loop.call_soon_threadsafe(self._put, item)
+
+    def _put(self, item: Union[Dict[str, Any], str]):
+        queue = self._queue
+        if len(queue) >= QUEUE_MAX:
+            for i, queued in enumerate(queue):
+                if _is_droppable(queued):
+                    del queue[i]
+                    break
+            else:
+                if _is_droppable(item):
+                    return
+        queue.append(item)
+        self._queue_ready.set()
+
+    async def _consume(self):
+        queue = self._queue
+        while True:
+            await self._queue_ready.wait()
+            batch = [queue.popleft() for _ in range(min(len(queue), BATCH_MAX))]
+            if not queue:
+                self._queue_ready.clear()
+            try:
+                # Items are either dicts or text encoded up front; splice the
+                # encoded events into one frame instead of sending each alone
+                events = [item if isinstance(item, str) else encode_message(item) for item in batch]
+                if len(events) == 1:
+                    await self.broadcast_encoded(events[0])
+                else:
+                    await self.broadcast_encoded('{"type":"batch","events":[' + ",".join(events) + "]}")
+            except Exception as e:
+                logger.error(f"Broadcast error: {e}")
 
     def set_loop(self, loop: asyncio.AbstractEventLoop):
         self._loop = loop
+        self._queue_ready = asyncio.Event()
+        self._consumer_task = loop.create_task(self._consume())
 
     async def cleanup(self):
-        """Cancel pending futures on shutdown"""
-        for future in self._pending_futures:
-            future.cancel()
-        self._pending_futures.clear()
+        """Stop the broadcast consumer on shutdown"""
+        if self._consumer_task:
+            self._consumer_task.cancel()
+            self._consumer_task = None
+
+
+def _is_droppable(item: Union[Dict[str, Any], str]) -> bool:
+    # Pre-encoded items are status frames, which are always kept
+    return isinstance(item, dict) and item.get("type") in DROPPABLE_TYPES
 
 
 ws_manager = WebSocketManager()
@@ -11,9 +11,13 @@ Usage:
     python build_portable.py
 """
 
+import os
 import subprocess
 import shutil
 import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).parent
@@ -23,15 +27,88 @@ DIST_DIR = ROOT_DIR / "dist"
 BUILD_DIR = ROOT_DIR / "build"
 
 
+# Output lines kept from a command to show when it fails
+OUTPUT_TAIL_LINES = 500
+
+
 def run_command(cmd: list, cwd: Path = None):
-    """Runs command and checks result."""
+    """Runs command and checks result.
+
+    Output is captured instead of streamed to the terminal, which is slow
+    for npm/PyInstaller; a dot is printed each second and the last lines
+    are shown only if the command fails.
+    """
     print(f">>> {' '.join(cmd)}")
-    result = subprocess.run(cmd, cwd=cwd, shell=sys.platform == "win32")
-    if result.returncode != 0:
+    # Resolve npm -> npm.cmd etc. so Windows does not need a shell
+    executable = shutil.which(cmd[0])
+    if executable:
+        cmd = [executable, *cmd[1:]]
+    proc = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        shell=sys.platform == "win32" and executable is None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        errors="replace",
+        bufsize=1,
+    )
+    tail = deque(maxlen=OUTPUT_TAIL_LINES)
+    reader = threading.Thread(target=tail.extend, args=(proc.stdout,), daemon=True)
+    reader.start()
+    while True:
+        try:
+            proc.wait(timeout=1)
+            break
+        except subprocess.TimeoutExpired:
+            print(".", end="", flush=True)
+    reader.join()
+    print()
+    if proc.returncode != 0:
+        print("".join(tail), end="")
         print(f"Error running: {' '.join(cmd)}")
         sys.exit(1)
 
 
+def _fast_copy(src, dst):
+    """copytree copy_function that copies file data inside the kernel.
+
+    shutil.copyfile already uses sendfile/fcopyfile where it can; on Linux
+    copy_file_range goes further and lets the filesystem share extents
+    (reflinks on btrfs/XFS) instead of moving bytes. Falls back to copy2.
+    """
+    if not hasattr(os, "copy_file_range"):
+        return shutil.copy2(src, dst)
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            remaining = os.fstat(fsrc.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        if remaining > 0:
+            return shutil.copy2(src, dst)
+    except OSError:
+        return shutil.copy2(src, dst)
+    shutil.copystat(src, dst)
+    return dst
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Different volume or no hardlink support (e.g. FAT): copy instead
+        return _fast_copy(src, dst)
+    return dst
+
+
+def _link_tree(src, dst):
+    """Mirror src into dst with hardlinks so the files share their data"""
+    shutil.copytree(src, dst, copy_function=_link_or_copy)
+
+
 def clean():
     """Clean previous builds."""
     print("\n=== Cleaning ===")
@@ -41,13 +118,39 @@ def clean():
             shutil.rmtree(path)
 
 
+def _ensure_pyinstaller():
+    """Install PyInstaller if it is missing."""
+    try:
+        import PyInstaller
+    except ImportError:
+        print("PyInstaller not installed. Installing...")
+        # Try uv (if environment was created with uv)
+        try:
+            run_command(["uv", "pip", "install", "pyinstaller"], cwd=BACKEND_DIR)
+        except Exception:
+            # Fallback to regular pip
+            run_command([sys.executable, "-m", "pip", "install", "pyinstaller"])
+
+
+def install_dependencies():
+    """Install frontend and backend build tools at the same time."""
+    print("\n=== Installing Dependencies ===")
+
+    # npm install and the PyInstaller check are independent and mostly wait on the network
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [
+            pool.submit(run_command, ["npm", "install"], cwd=FRONTEND_DIR),
+            pool.submit(_ensure_pyinstaller),
+        ]
+    # run_command exits on failure; result() re-raises that here
+    for future in futures:
+        future.result()
+
+
 def build_frontend():
     """Build React frontend."""
     print("\n=== Building Frontend ===")
 
-    # Install dependencies
-    run_command(["npm", "install"], cwd=FRONTEND_DIR)
-
     # Build production version
     run_command(["npm", "run", "build"], cwd=FRONTEND_DIR)
 
@@ -55,25 +158,13 @@ def build_frontend():
     src = FRONTEND_DIR / "dist"
     dst = BACKEND_DIR / "static"
     print(f"Copying {src} -> {dst}")
-    shutil.copytree(src, dst)
+    shutil.copytree(src, dst, copy_function=_fast_copy)
 
 
 def build_backend():
     """Build Python backend with PyInstaller."""
     print("\n=== Building Backend ===")
 
-    # Check PyInstaller
-    try:
-        import PyInstaller
-    except ImportError:
-        print("PyInstaller not installed. Installing...")
-        # Try uv (if environment was created with uv)
-        try:
-            run_command(["uv", "pip", "install", "pyinstaller"], cwd=BACKEND_DIR)
-        except Exception:
-            # Fallback to regular pip
-            run_command([sys.executable, "-m", "pip", "install", "pyinstaller"])
-
     # Use spec file for building
     spec_file = BACKEND_DIR / "MeshRadar.spec"
 
@@ -95,7 +186,7 @@ def copy_data_files():
     static_dst = DIST_DIR / "static"
     if static_src.exists():
         print(f"Copying {static_src} -> {static_dst}")
-        shutil.copytree(static_src, static_dst)
+        _link_tree(static_src, static_dst)
 
 
 def create_readme():
@@ -126,6 +217,7 @@ def main():
     print("=" * 50)
 
     clean()
+    install_dependencies()
     build_frontend()
     build_backend()
     copy_data_files()
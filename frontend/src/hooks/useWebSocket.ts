@@ -1,9 +1,40 @@
 import { useEffect, useRef } from 'react'
 import { useMeshStore } from '@/store'
-import type { Message, Node, ConnectionStatus, TracerouteResult } from '@/types'
+import type { Message, Node, NodesColumnar, ConnectionStatus, TracerouteResult } from '@/types'
 
 const NOTIFICATION_SOUND = 'data:audio/wav;base64,UklGRnoGAABXQVZFZm10IBAAAAABAAEAQB8AAEAfAAABAAgAZGF0YQoGAACBhYqFbF1fdJivrJBhNjVgodDbq2EcBj+a2teleQ0bXpPT5LyNMx06hbnU2JBFKTE5fLTIxoM/NTU7e7PEwHs2NS89fLPCu3U1Nz0+frLBt3E2OT5Bf7K/tG84O0BBgbK9sW05PEFDg7K7rmw6PUJFQ4Owuqtq'
 
+function nodesFromColumns(data: NodesColumnar): Node[] {
+  const { users, positions } = data
+  return data.nums.map((num, i) => {
+    const node: Node = {
+      id: data.ids[i] ?? '',
+      num,
+      lastHeard: data.lastHeard[i] ?? undefined,
+      snr: data.snr[i] ?? undefined,
+      isFavorite: data.isFavorite[i],
+    }
+    if (data.ids[i]) {
+      node.user = {
+        id: data.ids[i] as string,
+        longName: users.longName[i] ?? '',
+        shortName: users.shortName[i] ?? '',
+        hwModel: users.hwModel[i] ?? '',
+      }
+    }
+    // Leave position out when unknown so merging keeps the one already on screen;
+    // time is not in the snapshot, so it is left out rather than zeroed
+    if (positions.lat[i] != null && positions.lon[i] != null) {
+      node.position = {
+        latitude: positions.lat[i] as number,
+        longitude: positions.lon[i] as number,
+        altitude: positions.alt[i] ?? 0,
+      }
+    }
+    return node
+  })
+}
+
 export function useWebSocket() {
   const wsRef = useRef<WebSocket | null>(null)
   const reconnectRef = useRef<ReturnType<typeof setTimeout>>()
@@ -27,6 +58,129 @@ export function useWebSocket() {
     audioRef.current.play().catch(() => { })
   }
 
+  // Apply one server event to the store
+  const handleEvent = (msg: { type: string; data: any }) => {
+    const store = storeRef.current
+
+    switch (msg.type) {
+      case 'connection_status':
+        store.setStatus(msg.data as ConnectionStatus)
+        break
+
+      case 'message': {
+        const data = msg.data as {
+          packet_id: number
+          sender: string
+          receiver?: string
+          channel: number
+          text: string
+          timestamp?: number
+          snr?: number
+          hop_limit?: number
+          reply_id?: number
+        }
+
+        store.addMessage({
+          id: data.packet_id || Date.now(),
+          packet_id: data.packet_id,
+          sender: data.sender,
+          receiver: data.receiver,
+          channel: data.channel,
+          text: data.text,
+          timestamp: data.timestamp
+            ? new Date(data.timestamp * 1000).toISOString()
+            : new Date().toISOString(),
+          ack_status: 'received',
+          is_outgoing: false,
+          reply_id: data.reply_id,
+        })
+
+        const currentChat = store.currentChat
+
+        const isDM =
+          data.receiver && data.receiver !== '^all' && data.receiver !== 'broadcast'
+        const chatKey = isDM ? `dm:${data.sender}` : `channel:${data.channel}`
+        const isCurrentChat =
+          (isDM &&
+            currentChat?.type === 'dm' &&
+            currentChat.nodeId === data.sender) ||
+          (!isDM &&
+            currentChat?.type === 'channel' &&
+            currentChat.index === data.channel)
+
+        const myNodeId = store.status?.my_node_id
+        const isFromSelf = !!myNodeId && data.sender === myNodeId
+
+        const isPageActive =
+          typeof document !== 'undefined'
+            ? document.visibilityState === 'visible' && document.hasFocus()
+            : true
+
+        const shouldMarkUnread = !isCurrentChat || !isPageActive
+
+        if (!isFromSelf && shouldMarkUnread) {
+          store.incrementUnreadForChat(chatKey)
+        }
+
+        // Auto-create tab for new messages
+        if (!isFromSelf) {
+          if (isDM) {
+            // Find sender node to get name
+            const senderNode = store.nodes.find((n) => n.id === data.sender)
+            const senderName = senderNode?.user?.longName || senderNode?.user?.shortName || data.sender
+            store.addTab({
+              type: 'dm',
+              nodeId: data.sender,
+              name: senderName,
+            })
+          } else {
+            // Find channel to get name
+            const channel = store.channels.find((c) => c.index === data.channel)
+            const channelName = channel?.name || `Channel ${data.channel}`
+            store.addTab({
+              type: 'channel',
+              index: data.channel,
+              name: channelName,
+            })
+          }
+
+          playNotification()
+        }
+        break
+      }
+
+      case 'ack':
+        store.updateMessageAck(
+          msg.data.packet_id as number,
+          msg.data.status as Message['ack_status']
+        )
+        break
+
+      case 'node_update':
+        store.updateNode(msg.data as Node)
+        break
+
+      case 'nodes_snapshot_columnar':
+        store.mergeNodes(nodesFromColumns(msg.data as NodesColumnar))
+        break
+
+      case 'traceroute':
+        store.setTracerouteResult(msg.data as TracerouteResult)
+        break
+
+      case 'position':
+      case 'telemetry':
+        if (msg.data.from) {
+          store.updateNode({ id: msg.data.from, num: 0, ...msg.data } as Node)
+        }
+        break
+
+      case 'ping':
+        // Server ping, ignore
+        break
+    }
+  }
+
   const connect = () => {
     if (wsRef.current?.readyState === WebSocket.OPEN) return
 
@@ -40,121 +194,11 @@ export function useWebSocket() {
 
     ws.onmessage = (event) => {
       try {
-        const msg = JSON.parse(event.data)
-        const store = storeRef.current
-
-        switch (msg.type) {
-          case 'connection_status':
-            store.setStatus(msg.data as ConnectionStatus)
-            break
-
-          case 'message': {
-            const data = msg.data as {
-              packet_id: number
-              sender: string
-              receiver?: string
-              channel: number
-              text: string
-              timestamp?: number
-              snr?: number
-              hop_limit?: number
-              reply_id?: number
-            }
-
-            store.addMessage({
-              id: data.packet_id || Date.now(),
-              packet_id: data.packet_id,
-              sender: data.sender,
-              receiver: data.receiver,
-              channel: data.channel,
-              text: data.text,
-              timestamp: data.timestamp
-                ? new Date(data.timestamp * 1000).toISOString()
-                : new Date().toISOString(),
-              ack_status: 'received',
-              is_outgoing: false,
-              reply_id: data.reply_id,
-            })
-
-            const currentChat = store.currentChat
-
-            const isDM =
-              data.receiver && data.receiver !== '^all' && data.receiver !== 'broadcast'
-            const chatKey = isDM ? `dm:${data.sender}` : `channel:${data.channel}`
-            const isCurrentChat =
-              (isDM &&
-                currentChat?.type === 'dm' &&
-                currentChat.nodeId === data.sender) ||
-              (!isDM &&
-                currentChat?.type === 'channel' &&
-                currentChat.index === data.channel)
-
-            const myNodeId = store.status?.my_node_id
-            const isFromSelf = !!myNodeId && data.sender === myNodeId
-
-            const isPageActive =
-              typeof document !== 'undefined'
-                ? document.visibilityState === 'visible' && document.hasFocus()
-                : true
-
-            const shouldMarkUnread = !isCurrentChat || !isPageActive
-
-            if (!isFromSelf && shouldMarkUnread) {
-              store.incrementUnreadForChat(chatKey)
-            }
-
-            // Auto-create tab for new messages
-            if (!isFromSelf) {
-              if (isDM) {
-                // Find sender node to get name
-                const senderNode = store.nodes.find((n) => n.id === data.sender)
-                const senderName = senderNode?.user?.longName || senderNode?.user?.shortName || data.sender
-                store.addTab({
-                  type: 'dm',
-                  nodeId: data.sender,
-                  name: senderName,
-                })
-              } else {
-                // Find channel to get name
-                const channel = store.channels.find((c) => c.index === data.channel)
-                const channelName = channel?.name || `Channel ${data.channel}`
-                store.addTab({
-                  type: 'channel',
-                  index: data.channel,
-                  name: channelName,
-                })
-              }
-
-              playNotification()
-            }
-            break
-          }
-
-          case 'ack':
-            store.updateMessageAck(
-              msg.data.packet_id as number,
-              msg.data.status as Message['ack_status']
-            )
-            break
-
-          case 'node_update':
-            store.updateNode(msg.data as Node)
-            break
-
-          case 'traceroute':
-            store.setTracerouteResult(msg.data as TracerouteResult)
-            break
-
-          case 'position':
-          case 'telemetry':
-            if (msg.data.from) {
-              store.updateNode({ id: msg.data.from, num: 0, ...msg.data } as Node)
-            }
-            break
-
-          case 'ping':
-            // Server ping, ignore
-            break
+        const frame = JSON.parse(event.data)
+        // Bursts arrive coalesced into one {type: 'batch', events: [...]} frame
+        const events = frame.type === 'batch' ? frame.events : [frame]
+        for (const msg of events) {
+          handleEvent(msg)
         }
       } catch (e) {
         console.error('WS message parse error:', e)
@@ -16,6 +16,7 @@ interface MeshState {
   nodes: Node[]
   setNodes: (nodes: Node[]) => void
   updateNode: (node: Node) => void
+  mergeNodes: (nodes: Node[]) => void
 
   // Channels
   channels: Channel[]
@@ -84,6 +85,37 @@ export const useMeshStore = create<MeshState>()(
           }
           return { nodes: [...state.nodes, incoming] }
         }),
+      mergeNodes: (nodes) =>
+        set((state) => {
+          // One pass over id/num lookups instead of a findIndex per node.
+          // Matches like updateNode: by id first, so placeholders created by
+          // position/telemetry events (num 0) are merged, not duplicated
+          const merged = [...state.nodes]
+          const indexById = new Map<string, number>()
+          const indexByNum = new Map<number, number>()
+          merged.forEach((n, i) => {
+            if (n.id) indexById.set(n.id, i)
+            indexByNum.set(n.num, i)
+          })
+          for (const node of nodes) {
+            const idx = (node.id ? indexById.get(node.id) : undefined) ?? indexByNum.get(node.num)
+            if (idx !== undefined) {
+              const existing = merged[idx]
+              merged[idx] = {
+                ...existing,
+                ...node,
+                // Keep fields of the known position the snapshot lacks (time)
+                position: node.position ? { ...existing.position, ...node.position } : existing.position,
+              }
+              indexByNum.set(node.num, idx)
+            } else {
+              if (node.id) indexById.set(node.id, merged.length)
+              indexByNum.set(node.num, merged.length)
+              merged.push(node)
+            }
+          }
+          return { nodes: merged }
+        }),
 
       channels: [],
       setChannels: (channels) => set({ channels }),
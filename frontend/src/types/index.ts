@@ -11,7 +11,7 @@ export interface Node {
     latitude: number
     longitude: number
     altitude: number
-    time: number
+    time?: number
   }
   snr?: number
   lastHeard?: number
@@ -61,8 +61,35 @@ export interface TracerouteResult {
   snr_back: number[]
 }
 
+// Node list sent as parallel arrays: entry i of every column describes one node
+export interface NodesColumnar {
+  ids: (string | null)[]
+  nums: number[]
+  lastHeard: (number | null)[]
+  snr: (number | null)[]
+  isFavorite: boolean[]
+  users: {
+    longName: (string | null)[]
+    shortName: (string | null)[]
+    hwModel: (string | null)[]
+  }
+  positions: {
+    lat: (number | null)[]
+    lon: (number | null)[]
+    alt: (number | null)[]
+  }
+}
+
 export interface WSMessage {
-  type: 'message' | 'ack' | 'node_update' | 'connection_status' | 'traceroute' | 'position' | 'telemetry'
+  type:
+    | 'message'
+    | 'ack'
+    | 'node_update'
+    | 'nodes_snapshot_columnar'
+    | 'connection_status'
+    | 'traceroute'
+    | 'position'
+    | 'telemetry'
   data: Record<string, unknown>
 }
 